@@ -1,7 +1,9 @@
 # src/coinspot_api/__init__.py
 
 # Import main classes and functions
-from .coinspot import Coinspot, create_coinspot_api, CoinspotPublicApi, CoinspotApiError
+from .coinspot import Coinspot, create_coinspot_api, CoinspotPublicApi, CoinspotApiError, CoinspotTimeoutError, LatencyStats
+from .coinspot_state import OrderStateTracker, TrackedOrder, OrderEvent, DriftStats
+from .coinspot_portfolio import Portfolio
 
 # Import all types
 from .coinspot_types import (
@@ -29,7 +31,9 @@ from .coinspot_types import (
     WithdrawCoinResponse,
     CoinBalance,
     MyCoinBalancesResponse,
-    MyCoinBalanceResponse
+    MyCoinBalanceResponse,
+    Position,
+    PortfolioValuation
 )
 
 # Define what should be imported when someone does `from coinspot_api import *`
@@ -38,6 +42,13 @@ __all__ = [
     'create_coinspot_api',
     'CoinspotApiError',
     'CoinspotPublicApi',
+    'CoinspotTimeoutError',
+    'LatencyStats',
+    'OrderStateTracker',
+    'TrackedOrder',
+    'OrderEvent',
+    'DriftStats',
+    'Portfolio',
     'ApiStatusResponse',
     'BaseApiResponse',
     'PriceData',
@@ -62,7 +73,9 @@ __all__ = [
     'WithdrawCoinResponse',
     'CoinBalance',
     'MyCoinBalancesResponse',
-    'MyCoinBalanceResponse'
+    'MyCoinBalanceResponse',
+    'Position',
+    'PortfolioValuation'
 ]
 
 # You can also add metadata about your package
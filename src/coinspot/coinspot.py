@@ -1,4 +1,8 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Iterator
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from contextlib import contextmanager, ExitStack
+import threading
 import time
 import hmac
 import hashlib
@@ -15,8 +19,174 @@ class CoinspotApiError(Exception):
         self.message = message
         super().__init__(f"API Error: Status - {status}, Message - {message}")
 
-class CoinspotApiBase:
-    def __init__(self, key: Optional[str], secret: Optional[str]):
+class CoinspotTimeoutError(CoinspotApiError):
+    def __init__(self, message):
+        super().__init__("Timeout", message)
+
+DEFAULT_TIMEOUT = 10.0
+
+
+# Latency and deadlines, shared by the public and authenticated APIs
+
+class LatencyStats:
+    def __init__(self, window: int = 500):
+        self.samples: deque = deque(maxlen=window)
+        self.requests = 0
+        self.timeouts = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(p / 100 * (len(samples) - 1)))))
+        return samples[index]
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {"requests": self.requests, "samples": len(self.samples), "timeouts": self.timeouts,
+                      "hedges_sent": self.hedges_sent, "hedges_won": self.hedges_won}
+        return {
+            **counts,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.percentile(100),
+        }
+
+
+class CoinspotDeadlines:
+    """
+    Every call runs on a daemon thread and the caller waits at most until its deadline, so a slow
+    connect, a response that trickles in or a stuck hedge can't hold it past that point. The
+    request itself keeps running after the caller gives up, so a CoinspotTimeoutError from a
+    place, edit or cancel call doesn't mean the exchange didn't act on it.
+    """
+
+    def __init__(self, timeout: Optional[float] = DEFAULT_TIMEOUT, max_concurrency: int = 8):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.latency = LatencyStats()
+        self._batch = threading.local()
+        # Room for an attempt and its hedge per concurrent caller
+        self._slots = threading.BoundedSemaphore(2 * max_concurrency)
+        self._closed = False
+
+    @contextmanager
+    def deadline(self, seconds: float) -> Iterator[None]:
+        """Bound every call made inside the block, on this thread, by one shared deadline."""
+        previous = getattr(self._batch, "deadline", None)
+        deadline = time.monotonic() + seconds
+        self._batch.deadline = deadline if previous is None else min(previous, deadline)
+        try:
+            yield
+        finally:
+            self._batch.deadline = previous
+
+    def close(self) -> None:
+        """Refuse new calls, requests already in flight finish or time out on their own."""
+        self._closed = True
+
+    def _deadline_for(self, timeout: Optional[float]) -> Optional[float]:
+        timeout = self.timeout if timeout is None else timeout
+        deadlines = [d for d in (getattr(self._batch, "deadline", None),
+                                 time.monotonic() + timeout if timeout is not None else None) if d is not None]
+        return min(deadlines) if deadlines else None
+
+    def _submit(self, method: str, url: str, deadline: Optional[float], **kwargs: Any) -> Future:
+        if self._closed:
+            raise CoinspotApiError("Closed", "This API instance has been closed")
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not self._slots.acquire(timeout=remaining):
+            raise CoinspotTimeoutError("Deadline exceeded waiting for a free request slot")
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+
+        def run() -> None:
+            try:
+                future.set_result(self._attempt(method, url, deadline, **kwargs))
+            except BaseException as err:
+                future.set_exception(err)
+            finally:
+                self._slots.release()
+
+        # Daemon threads, so a request stuck without a deadline can't keep the interpreter alive
+        threading.Thread(target=run, name="coinspot-request", daemon=True).start()
+        return future
+
+    def _attempt(self, method: str, url: str, deadline: Optional[float], **kwargs: Any) -> requests.Response:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise CoinspotTimeoutError("Deadline exceeded before the request was sent")
+        start = time.monotonic()
+        try:
+            response = requests.request(method, url, timeout=remaining, **kwargs)
+        except requests.Timeout as timeout_err:
+            self.latency.record(time.monotonic() - start)
+            raise CoinspotTimeoutError(str(timeout_err))
+        self.latency.record(time.monotonic() - start)
+        if deadline is not None and time.monotonic() > deadline:
+            raise CoinspotTimeoutError("Deadline exceeded while reading the response")
+        return response
+
+    def _send(self, method: str, url: str, deadline: Optional[float], hedge_after: Optional[float] = None,
+              **kwargs: Any) -> requests.Response:
+        self.latency.count("requests")
+        try:
+            return self._race(method, url, deadline, hedge_after, **kwargs)
+        except CoinspotTimeoutError:
+            self.latency.count("timeouts")
+            raise
+
+    def _race(self, method: str, url: str, deadline: Optional[float], hedge_after: Optional[float],
+              **kwargs: Any) -> requests.Response:
+        if deadline is not None and deadline <= time.monotonic():
+            raise CoinspotTimeoutError("Deadline exceeded before the request was sent")
+        attempts: List[Future] = [self._submit(method, url, deadline, **kwargs)]
+        if hedge_after is not None:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = wait(attempts, timeout=hedge_after if remaining is None else min(hedge_after, remaining))
+            if not done and (deadline is None or time.monotonic() < deadline):
+                try:
+                    attempts.append(self._submit(method, url, deadline, **kwargs))
+                    self.latency.count("hedges_sent")
+                except CoinspotTimeoutError:
+                    # No slot free for the hedge, keep waiting on the first attempt
+                    pass
+
+        pending = set(attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not attempts[0]:
+                        self.latency.count("hedges_won")
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        raise CoinspotTimeoutError("Deadline exceeded waiting for a response")
+
+
+class CoinspotApiBase(CoinspotDeadlines):
+    def __init__(self, key: Optional[str], secret: Optional[str], timeout: Optional[float] = DEFAULT_TIMEOUT,
+                 max_concurrency: int = 8):
+        super().__init__(timeout, max_concurrency)
         self.key = key
         self.secret = secret
         self.base_url = "https://www.coinspot.com.au/api/v2"
@@ -31,7 +201,8 @@ class CoinspotApiBase:
         except requests.HTTPError as http_err:
             raise CoinspotApiError(response.status_code, str(http_err))
 
-    def _request(self, path: str, data: Dict[str, Any] = {}, read_only: bool = False) -> Dict[str, Any]:
+    def _request(self, path: str, data: Dict[str, Any] = {}, read_only: bool = False, timeout: Optional[float] = None) -> Dict[str, Any]:
+        deadline = self._deadline_for(timeout)
         nonce = int(time.time()*1000)
         payload = {"nonce": nonce, **data}
         payload_str = json.dumps(payload, separators=(',', ':'))
@@ -46,13 +217,25 @@ class CoinspotApiBase:
         }
 
         url = f"{self.base_url}{'/ro' if read_only else ''}{path}"
-        response = requests.post(url, headers=headers, data=payload_str)
+        response = self._send("POST", url, deadline, headers=headers, data=payload_str)
         return self._handle_response(response)
 
 
-class CoinspotPublicApi:
-    def __init__(self):
+class CoinspotPublicApi(CoinspotDeadlines):
+    """
+    Public reads are idempotent, so with hedge=True a second attempt is sent when the first is
+    slower than hedge_percentile of recent latencies, and whichever answers first wins.
+    """
+
+    def __init__(self, timeout: Optional[float] = DEFAULT_TIMEOUT, hedge: bool = False,
+                 hedge_percentile: float = 95.0, hedge_min_samples: int = 20, hedge_delay: Optional[float] = None,
+                 max_concurrency: int = 8):
+        super().__init__(timeout, max_concurrency)
         self.base_url = "https://www.coinspot.com.au/pubapi/v2"
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_delay = hedge_delay
 
     def _handle_response(self, response: requests.Response) -> Dict[str, Any]:
         try:
@@ -64,9 +247,18 @@ class CoinspotPublicApi:
         except requests.HTTPError as http_err:
             raise CoinspotApiError(response.status_code, str(http_err))
 
-    def _get(self, path: str) -> Dict[str, Any]:
-        response = requests.get(f"{self.base_url}{path}")
-        return self._handle_response(response)
+    def _get(self, path: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        deadline = self._deadline_for(timeout)
+        return self._handle_response(self._send("GET", f"{self.base_url}{path}", deadline, self._hedge_after()))
+
+    def _hedge_after(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        if len(self.latency.samples) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
 
     def get_latest_prices(self) -> LatestPricesResponse:
         return self._get("/latest")
@@ -228,10 +420,30 @@ class CoinspotApi(CoinspotApiBase):
 
 # A more simplified API, wrapper around the Public, Read-Only and Full Access APIs
 class Coinspot:
-    def __init__(self, api_key: Optional[str] = None, api_secret: Optional[str] = None):
-        self.public: CoinspotPublicApi = CoinspotPublicApi()
-        self.read_only: Optional[CoinspotReadOnlyApi] = CoinspotReadOnlyApi(api_key, api_secret) if api_key and api_secret else None
-        self.authenticated: Optional[CoinspotApi] = CoinspotApi(api_key, api_secret) if api_key and api_secret else None
+    def __init__(self, api_key: Optional[str] = None, api_secret: Optional[str] = None,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT, hedge: bool = False, hedge_percentile: float = 95.0,
+                 hedge_min_samples: int = 20, hedge_delay: Optional[float] = None, max_concurrency: int = 8):
+        self.public: CoinspotPublicApi = CoinspotPublicApi(timeout, hedge, hedge_percentile, hedge_min_samples, hedge_delay, max_concurrency)
+        self.read_only: Optional[CoinspotReadOnlyApi] = CoinspotReadOnlyApi(api_key, api_secret, timeout, max_concurrency) if api_key and api_secret else None
+        self.authenticated: Optional[CoinspotApi] = CoinspotApi(api_key, api_secret, timeout, max_concurrency) if api_key and api_secret else None
+
+    @contextmanager
+    def deadline(self, seconds: float) -> Iterator[None]:
+        """Share one deadline across every call in the block, whichever API it goes through."""
+        with ExitStack() as stack:
+            for api in (self.public, self.read_only, self.authenticated):
+                if api is not None:
+                    stack.enter_context(api.deadline(seconds))
+            yield
+
+    def close(self) -> None:
+        for api in (self.public, self.read_only, self.authenticated):
+            if api is not None:
+                api.close()
+
+    def latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        apis = {"public": self.public, "read_only": self.read_only, "authenticated": self.authenticated}
+        return {name: api.latency.as_dict() for name, api in apis.items() if api is not None}
     
     def latest_coin_price(self, coin: str) -> LatestCoinPricesResponse:
         return self.public.get_latest_coin_price(coin)
@@ -341,8 +553,10 @@ class Coinspot:
         return self.authenticated.withdraw_coin(coin, amount, address, email_confirm, network, payment_id)
 
 
-def create_coinspot_api(api_key: Optional[str] = None, api_secret: Optional[str] = None) -> Coinspot:
+def create_coinspot_api(api_key: Optional[str] = None, api_secret: Optional[str] = None,
+                        timeout: Optional[float] = DEFAULT_TIMEOUT, hedge: bool = False, hedge_percentile: float = 95.0,
+                        hedge_min_samples: int = 20, hedge_delay: Optional[float] = None, max_concurrency: int = 8) -> Coinspot:
     try:
-        return Coinspot(api_key, api_secret)
+        return Coinspot(api_key, api_secret, timeout, hedge, hedge_percentile, hedge_min_samples, hedge_delay, max_concurrency)
     except Exception as e:
         raise CoinspotApiError("Initialization Error", str(e))
\ No newline at end of file
@@ -0,0 +1,289 @@
+from typing import Optional, Dict, Any, List, Tuple
+from array import array
+from collections import deque, Counter
+from datetime import datetime, timezone
+import math
+
+from coinspot.coinspot import CoinspotPublicApi, CoinspotReadOnlyApi
+from coinspot.coinspot_types import CompletedOrder, CompletedOrdersResponse, LatestPricesResponse, MyCoinBalancesResponse, PortfolioValuation, Position
+
+# Portfolio valuation and P&L, positions are kept column-wise in arrays indexed by coin
+
+COST_METHODS = ("fifo", "average")
+
+# (side, amount, total, date) for a single fill
+Fill = Tuple[str, float, float, str]
+
+
+def _split_market(coin: str, market: Optional[str]) -> Tuple[str, str]:
+    if market and "/" in market:
+        base, quote = market.split("/", 1)
+        return base.upper(), quote.upper()
+    return coin.upper(), (market or "AUD").upper()
+
+
+def _parse_solddate(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class Portfolio:
+    """
+    Joins balances, fills from the order history endpoints and a latest prices snapshot into
+    positions. Fills and prices can be fed in incrementally, valuation() marks every coin in one pass.
+    Held quantities come from the last balances snapshot plus any fills sold after it was loaded.
+    Cost basis only covers what is both bought and still held, coins deposited without a purchase
+    are reported as untracked and bought coins no longer held (withdrawn) as withdrawn.
+    """
+
+    def __init__(self, method: str = "fifo", quote: str = "AUD", mark: str = "last"):
+        if method not in COST_METHODS:
+            raise ValueError(f"method must be one of {', '.join(COST_METHODS)}")
+        self.method = method
+        self.quote = quote.upper()
+        self.mark = mark
+        self.skipped_fills = 0
+
+        self.coins: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.quantity = array("d")  # held, from the last balances snapshot
+        self.flow = array("d")      # net of every fill, quote currency included
+        self.pending = array("d")   # net of fills sold after the balances snapshot
+        self.tracked = array("d")   # held according to fills, what the cost basis covers
+        self.cost = array("d")
+        self.realised = array("d")
+        self.price = array("d")
+
+        self._marks: Dict[str, float] = {self.quote: 1.0}
+        self._fills: Dict[str, List[Fill]] = {}
+        self._lots: Dict[str, deque] = {}
+        self._seen_ids: set = set()
+        self._seen: Counter = Counter()
+        self._has_balances = False
+        self._balances_at: Optional[datetime] = None
+        self._history_since: Optional[str] = None
+        self.history_truncated = False
+
+    def _column(self, coin: str) -> int:
+        coin = coin.upper()
+        index = self._index.get(coin)
+        if index is None:
+            index = len(self.coins)
+            self._index[coin] = index
+            self.coins.append(coin)
+            for column in (self.quantity, self.flow, self.pending, self.tracked, self.cost, self.realised):
+                column.append(0.0)
+            self.price.append(self._marks.get(coin, math.nan))
+        return index
+
+    # Inputs
+
+    def update_balances(self, response: MyCoinBalancesResponse) -> None:
+        held: Dict[str, float] = {}
+        for item in response.get("balances", []):
+            for coin, details in item.items():
+                held[coin.upper()] = float(details.get("balance", 0))
+        for coin in held:
+            self._column(coin)
+        for i, coin in enumerate(self.coins):
+            self.quantity[i] = held.get(coin, 0.0)
+            self.pending[i] = 0.0
+        self._has_balances = True
+        self._balances_at = datetime.now(timezone.utc)
+
+    def update_prices(self, response: LatestPricesResponse) -> None:
+        for key, data in response.get("prices", {}).items():
+            # Non-AUD markets come through keyed like "btc_usdt"
+            coin, _, quote = key.partition("_")
+            if (quote or "AUD").upper() == self.quote and data.get(self.mark) is not None:
+                self._marks[coin.upper()] = float(data[self.mark])
+        for i, coin in enumerate(self.coins):
+            self.price[i] = self._marks.get(coin, self.price[i])
+
+    def update_price(self, coin: str, price: float) -> None:
+        self._marks[coin.upper()] = float(price)
+        if coin.upper() in self._index:
+            self.price[self._index[coin.upper()]] = float(price)
+
+    def add_order_history(self, response: CompletedOrdersResponse) -> int:
+        """Apply fills not seen before and return how many were new."""
+        new: Dict[str, List[Fill]] = {}
+        occurrences: Counter = Counter()
+        for side in ("buy", "sell"):
+            for order in response.get(f"{side}orders", []):
+                fill = self._parse_fill(side, order, occurrences)
+                if fill is not None:
+                    coin, parsed = fill
+                    new.setdefault(coin, []).append(parsed)
+        self._seen |= occurrences
+
+        added = 0
+        for coin, fills in new.items():
+            fills.sort(key=lambda fill: fill[3])
+            history = self._fills.setdefault(coin, [])
+            in_order = not history or fills[0][3] >= history[-1][3]
+            history.extend(fills)
+            i = self._column(coin)
+            q = self._column(self.quote)
+            for side, amount, total, date in fills:
+                sign = 1.0 if side == "buy" else -1.0
+                self.flow[i] += sign * amount
+                self.flow[q] -= sign * total
+                # Fills up to the snapshot are already in it
+                solddate = _parse_solddate(date)
+                if self._balances_at is not None and solddate is not None and solddate > self._balances_at:
+                    self.pending[i] += sign * amount
+                    self.pending[q] -= sign * total
+            if in_order:
+                for fill in fills:
+                    self._apply(coin, i, fill)
+            else:
+                # A late fill changes which lots later sells matched, so replay this coin
+                history.sort(key=lambda fill: fill[3])
+                self._replay(coin, i)
+            added += len(fills)
+        return added
+
+    def _parse_fill(self, side: str, order: CompletedOrder, occurrences: Counter) -> Optional[Tuple[str, Fill]]:
+        coin, quote = _split_market(order.get("coin", ""), order.get("market"))
+        if quote != self.quote or not coin:
+            self.skipped_fills += 1
+            return None
+        amount = float(order.get("amount", 0))
+        total = float(order["total"]) if order.get("total") is not None else amount * float(order.get("rate", 0))
+        date = str(order.get("solddate", ""))
+        if amount <= 0:
+            return None
+        if order.get("id") is not None:
+            if order["id"] in self._seen_ids:
+                return None
+            self._seen_ids.add(order["id"])
+            return coin, (side, amount, total, date)
+        # Without an id, identical fills can only be told apart by how many times they appear, so
+        # only the copies beyond those seen in earlier responses are new
+        key = (side, coin, amount, total, date)
+        occurrences[key] += 1
+        if occurrences[key] <= self._seen[key]:
+            return None
+        return coin, (side, amount, total, date)
+
+    def _apply(self, coin: str, i: int, fill: Fill) -> None:
+        side, amount, total, _ = fill
+        lots = self._lots.setdefault(coin, deque())
+        if side == "buy":
+            self.tracked[i] += amount
+            self.cost[i] += total
+            if self.method == "fifo":
+                lots.append([amount, total / amount])
+            return
+
+        # Coins that arrived by deposit have no cost basis, only the matched part of a sell is realised
+        matched = min(amount, self.tracked[i])
+        if matched <= 0:
+            return
+        if self.method == "fifo":
+            matched_cost = 0.0
+            remaining = matched
+            while remaining > 0 and lots:
+                lot = lots[0]
+                take = min(remaining, lot[0])
+                matched_cost += take * lot[1]
+                lot[0] -= take
+                remaining -= take
+                if lot[0] <= 1e-12:
+                    lots.popleft()
+        else:
+            matched_cost = self.cost[i] * matched / self.tracked[i]
+        self.realised[i] += total * matched / amount - matched_cost
+        self.tracked[i] -= matched
+        self.cost[i] = max(0.0, self.cost[i] - matched_cost)
+
+    def _replay(self, coin: str, i: int) -> None:
+        self.tracked[i] = self.cost[i] = self.realised[i] = 0.0
+        self._lots[coin] = deque()
+        for fill in self._fills[coin]:
+            self._apply(coin, i, fill)
+
+    def fetch_order_history(self, read_only: CoinspotReadOnlyApi, startdate: Optional[str] = None,
+                            limit: int = 500) -> CompletedOrdersResponse:
+        """
+        Page backwards through the order history from today to startdate. The endpoint returns the
+        most recent limit fills in the date range and takes whole days (YYYY-MM-DD), so each page
+        ends on the oldest day of the one before and the overlap is dropped when the pages are merged.
+        """
+        pages: Counter = Counter()
+        enddate: Optional[str] = None
+        while True:
+            response = read_only.get_my_order_history(startdate=startdate, enddate=enddate, limit=limit)
+            page: Counter = Counter()
+            for side in ("buy", "sell"):
+                for order in response.get(f"{side}orders", []):
+                    page[(side, tuple(sorted(order.items())))] += 1
+            # A fill on the overlapping day appears in both pages, count it as often as either page has it
+            pages |= page
+            if sum(page.values()) < limit:
+                break
+            oldest = min(str(dict(row).get("solddate", ""))[:10] for _, row in page)
+            if not oldest or oldest == enddate or oldest == startdate:
+                # More than a page of fills on one day, the rest can't be reached by date
+                self.history_truncated = True
+                break
+            enddate = oldest
+
+        merged = CompletedOrdersResponse(status="ok", buyorders=[], sellorders=[])
+        for (side, row), count in pages.items():
+            merged[f"{side}orders"].extend(dict(row) for _ in range(count))
+        return merged
+
+    def refresh(self, read_only: CoinspotReadOnlyApi, public: CoinspotPublicApi, startdate: Optional[str] = None,
+                limit: int = 500) -> PortfolioValuation:
+        """
+        Fetch the order history since the last fill seen (or startdate), balances and prices, then
+        value the portfolio. The first call pages through the whole history.
+        """
+        history = self.fetch_order_history(read_only, startdate or self._history_since, limit)
+        self.add_order_history(history)
+        dates = [str(order.get("solddate", ""))[:10] for side in ("buy", "sell") for order in history.get(f"{side}orders", [])]
+        if any(dates):
+            self._history_since = max([date for date in dates if date] + ([self._history_since] if self._history_since else []))
+        self.update_balances(read_only.get_my_coin_balances())
+        self.update_prices(public.get_latest_prices())
+        return self.valuation()
+
+    # Outputs
+
+    def valuation(self) -> PortfolioValuation:
+        # Unpriced coins stay NaN and are left out of the totals rather than marked at zero
+        quote = self._index.get(self.quote)
+        quantity = array("d", (q + d for q, d in zip(self.quantity, self.pending))) if self._has_balances else self.flow
+        # Cost basis is scaled down to what is still held, the rest was withdrawn
+        covered = array("d", (min(t, max(q, 0.0)) for t, q in zip(self.tracked, quantity)))
+        cost = array("d", (c * v / t if t > 0 else 0.0 for c, v, t in zip(self.cost, covered, self.tracked)))
+        untracked = array("d", (max(0.0, q - v) for q, v in zip(quantity, covered)))
+        withdrawn = array("d", (t - v for t, v in zip(self.tracked, covered)))
+        market_value = array("d", (q * p for q, p in zip(quantity, self.price)))
+        unrealised = array("d", (v * p - c for v, p, c in zip(covered, self.price, cost)))
+        if quote is not None:
+            unrealised[quote] = untracked[quote] = 0.0
+        total_value = math.fsum(v for v in market_value if not math.isnan(v))
+        exposure = array("d", (v if math.isnan(v) else v / total_value if total_value else 0.0 for v in market_value))
+
+        positions: Dict[str, Position] = {}
+        for i, coin in enumerate(self.coins):
+            positions[coin] = Position(quantity=quantity[i], price=self.price[i], market_value=market_value[i],
+                                       cost_basis=cost[i], unrealised=unrealised[i], realised=self.realised[i],
+                                       exposure=exposure[i], untracked=untracked[i], withdrawn=withdrawn[i])
+        return PortfolioValuation(quote=self.quote, total_value=total_value, cost_basis=math.fsum(cost),
+                                  unrealised=math.fsum(u for u in unrealised if not math.isnan(u)),
+                                  realised=math.fsum(self.realised), positions=positions,
+                                  unpriced=[coin for coin, p in zip(self.coins, self.price) if math.isnan(p)])
+
+    def position(self, coin: str) -> Optional[Position]:
+        return self.valuation()["positions"].get(coin.upper())
+
+    def as_columns(self) -> Dict[str, Any]:
+        return {"coins": list(self.coins), "quantity": self.quantity, "flow": self.flow, "pending": self.pending, "tracked": self.tracked,
+                "cost": self.cost, "realised": self.realised, "price": self.price}
@@ -0,0 +1,441 @@
+from typing import Optional, Dict, Any, List, Callable, Tuple
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import time
+import requests
+
+from coinspot.coinspot import CoinspotApi, CoinspotReadOnlyApi, CoinspotApiError
+from coinspot.coinspot_types import CancelOrderResponse, CompletedOrder, EditOpenMarketBuySellOrderResponse, OpenOrder, PlaceMarketBuySellOrderResponse
+
+# Local order and balance state, so callers don't have to poll the read-only API to learn about fills
+
+DEFAULT_MARKET = "AUD"
+
+
+def _quote_currency(market: Optional[str]) -> str:
+    # Coinspot reports markets as "BTC/AUD" or "BTC/USDT", the quote currency is the part after the slash
+    if market and "/" in market:
+        return market.split("/")[-1].upper()
+    return (market or DEFAULT_MARKET).upper()
+
+
+def _parse_solddate(value: Any) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+# Order history rows have no id, so fills are matched to orders on side, coin, quote currency and rate
+HistoryKey = Tuple[str, str, str, float]
+
+
+class TrackedOrder:
+    def __init__(self, id: str, side: str, cointype: str, amount: float, rate: float, market: Optional[str] = None,
+                 placed_at: Optional[datetime] = None):
+        self.id = id
+        self.side = side
+        self.cointype = cointype.upper()
+        self.amount = float(amount)
+        self.rate = float(rate)
+        self.market = market or f"{self.cointype}/{DEFAULT_MARKET}"
+        self.filled = 0.0
+        self.cancel_requested = False
+        # Only set for orders placed through the tracker, adopted orders have no known start
+        self.placed_at = placed_at
+
+    @property
+    def history_key(self) -> HistoryKey:
+        return (self.side, self.cointype, _quote_currency(self.market), self.rate)
+
+    def __repr__(self) -> str:
+        return f"TrackedOrder(id={self.id!r}, side={self.side!r}, cointype={self.cointype!r}, amount={self.amount}, rate={self.rate})"
+
+
+class OrderEvent:
+    # kind is one of "fill", "partial_fill", "cancel", "adopted" (an open order placed outside this tracker)
+    # or "unknown" (gone from the book, but the order history can't say whether it filled)
+    def __init__(self, kind: str, order: TrackedOrder, amount: float):
+        self.kind = kind
+        self.order = order
+        self.amount = amount
+        self.timestamp = time.time()
+
+    def __repr__(self) -> str:
+        return f"OrderEvent(kind={self.kind!r}, order={self.order!r}, amount={self.amount})"
+
+
+class DriftStats:
+    def __init__(self):
+        self.reconciliations = 0
+        self.read_only_calls = 0
+        self.skipped_polls = 0
+        self.order_mismatches = 0
+        self.balance_checks = 0
+        self.balance_mismatches = 0
+        self.max_balance_drift = 0.0
+        self.total_balance_drift = 0.0
+
+    @property
+    def mean_balance_drift(self) -> float:
+        return self.total_balance_drift / self.balance_checks if self.balance_checks else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "reconciliations": self.reconciliations,
+            "read_only_calls": self.read_only_calls,
+            "skipped_polls": self.skipped_polls,
+            "order_mismatches": self.order_mismatches,
+            "balance_checks": self.balance_checks,
+            "balance_mismatches": self.balance_mismatches,
+            "max_balance_drift": self.max_balance_drift,
+            "mean_balance_drift": self.mean_balance_drift,
+        }
+
+
+class OrderStateTracker:
+    """
+    Records orders placed, edited and cancelled through CoinspotApi and keeps an in-memory
+    index of open orders and estimated balances. The read-only endpoints are only hit from
+    poll() when the adaptive reconcile interval has elapsed or local state is ambiguous.
+    """
+
+    def __init__(self, api: CoinspotApi, read_only: CoinspotReadOnlyApi,
+                 min_interval: float = 2.0, max_interval: float = 60.0, backoff: float = 2.0,
+                 balance_interval: float = 300.0, balance_tolerance: float = 1e-8, clock_skew: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("min_interval must be positive and no greater than max_interval")
+        if backoff < 1:
+            raise ValueError("backoff must be at least 1")
+        self.api = api
+        self.read_only = read_only
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.balance_interval = balance_interval
+        self.balance_tolerance = balance_tolerance
+        self.clock_skew = timedelta(seconds=clock_skew)
+        self.clock = clock
+        self.stats = DriftStats()
+
+        self.open_orders: Dict[str, TrackedOrder] = {}
+        self.balances: Dict[str, float] = {}
+        self._listeners: List[Callable[[OrderEvent], None]] = []
+        self._interval = min_interval
+        self._next_reconcile = clock()
+        self._next_balance_sync = clock()
+        self._ambiguous = True
+        self._balances_dirty = True
+        # History rows already attributed to settled orders, and fills settled per key while
+        # another order at the same key is still open
+        self._consumed: Counter = Counter()
+        self._settled: Dict[HistoryKey, Tuple[float, datetime]] = {}
+
+    # Events
+
+    def add_listener(self, callback: Callable[[OrderEvent], None]) -> None:
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[OrderEvent], None]) -> None:
+        self._listeners.remove(callback)
+
+    def _emit(self, events: List[OrderEvent]) -> None:
+        for event in events:
+            for callback in list(self._listeners):
+                callback(event)
+
+    # Order placement, mirrors the CoinspotApi methods
+
+    def place_market_buy_order(self, cointype: str, amount: float, rate: float, markettype: Optional[str] = None) -> PlaceMarketBuySellOrderResponse:
+        response = self._guarded(self.api.place_market_buy_order, cointype, amount, rate, markettype)
+        self._record_placed("buy", cointype, amount, rate, markettype, response)
+        return response
+
+    def place_market_sell_order(self, cointype: str, amount: float, rate: float, markettype: Optional[str] = None) -> PlaceMarketBuySellOrderResponse:
+        response = self._guarded(self.api.place_market_sell_order, cointype, amount, rate, markettype)
+        self._record_placed("sell", cointype, amount, rate, markettype, response)
+        return response
+
+    def edit_open_market_buy_order(self, cointype: str, id: str, rate: float, newrate: float) -> EditOpenMarketBuySellOrderResponse:
+        response = self._guarded(self.api.edit_open_market_buy_order, cointype, id, rate, newrate)
+        self._record_edited(id, response)
+        return response
+
+    def edit_open_market_sell_order(self, cointype: str, id: str, rate: float, newrate: float) -> EditOpenMarketBuySellOrderResponse:
+        response = self._guarded(self.api.edit_open_market_sell_order, cointype, id, rate, newrate)
+        self._record_edited(id, response)
+        return response
+
+    def cancel_buy_order(self, id: str) -> CancelOrderResponse:
+        return self._cancel(self.api.cancel_buy_order, id)
+
+    def cancel_sell_order(self, id: str) -> CancelOrderResponse:
+        return self._cancel(self.api.cancel_sell_order, id)
+
+    def cancel_all_buy_orders(self, coin: Optional[str] = None) -> CancelOrderResponse:
+        return self._cancel_all(self.api.cancel_all_buy_orders, "buy", coin)
+
+    def cancel_all_sell_orders(self, coin: Optional[str] = None) -> CancelOrderResponse:
+        return self._cancel_all(self.api.cancel_all_sell_orders, "sell", coin)
+
+    def _guarded(self, method: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+        # An error from a mutating call leaves us unsure what happened on the exchange side
+        try:
+            return method(*args)
+        except (CoinspotApiError, requests.RequestException):
+            self.mark_ambiguous()
+            raise
+
+    def _record_placed(self, side: str, cointype: str, amount: float, rate: float,
+                       markettype: Optional[str], response: PlaceMarketBuySellOrderResponse) -> None:
+        order_id = response.get("id")
+        if not order_id:
+            self.mark_ambiguous()
+            return
+        market = response.get("market") or (f"{cointype.upper()}/{markettype.upper()}" if markettype else None)
+        placed_at = datetime.now(timezone.utc) - self.clock_skew
+        self.open_orders[str(order_id)] = TrackedOrder(str(order_id), side, response.get("coin") or cointype,
+                                                       response.get("amount", amount), response.get("rate", rate), market,
+                                                       placed_at)
+        self._expect_change()
+
+    def _record_edited(self, id: str, response: EditOpenMarketBuySellOrderResponse) -> None:
+        order = self.open_orders.get(str(id))
+        if order is None or not response.get("updated", False):
+            self.mark_ambiguous()
+            return
+        order.rate = float(response.get("newrate", order.rate))
+        if response.get("amount") is not None:
+            order.amount = float(response["amount"])
+        self._expect_change()
+
+    def _cancel(self, method: Callable[[str], CancelOrderResponse], id: str) -> CancelOrderResponse:
+        response = self._guarded(method, id)
+        # Part of the order may have filled before the cancel landed, so let the next reconcile decide
+        order = self.open_orders.get(str(id))
+        if order is not None:
+            order.cancel_requested = True
+        self.mark_ambiguous()
+        return response
+
+    def _cancel_all(self, method: Callable[[Optional[str]], CancelOrderResponse], side: str, coin: Optional[str]) -> CancelOrderResponse:
+        response = self._guarded(method, coin)
+        # Some of these may have filled before the cancel landed, so let the next reconcile decide
+        for order in self.open_orders.values():
+            if order.side == side and (coin is None or order.cointype == coin.upper()):
+                order.cancel_requested = True
+        self.mark_ambiguous()
+        return response
+
+    # Reconciliation
+
+    def mark_ambiguous(self) -> None:
+        self._ambiguous = True
+
+    def _expect_change(self) -> None:
+        # Freshly touched orders are the most likely to change, so poll quickly for a while
+        self._interval = self.min_interval
+        self._next_reconcile = min(self._next_reconcile, self.clock() + self._interval)
+
+    @property
+    def reconcile_due(self) -> bool:
+        return self._ambiguous or self.clock() >= self._next_reconcile
+
+    def poll(self, force: bool = False) -> List[OrderEvent]:
+        """Reconcile with the read-only API if due and return any events raised."""
+        if not (force or self.reconcile_due):
+            self.stats.skipped_polls += 1
+            return []
+        events = self.reconcile_orders()
+        now = self.clock()
+        if force or (self._balances_dirty and now >= self._next_balance_sync):
+            self.reconcile_balances()
+        return events
+
+    def reconcile_orders(self) -> List[OrderEvent]:
+        remote: Dict[str, OpenOrder] = {}
+        sides: Dict[str, str] = {}
+        for response in (self.read_only.get_my_open_market_orders(), self.read_only.get_my_open_limit_orders()):
+            self.stats.read_only_calls += 1
+            for side in ("buy", "sell"):
+                for order in response.get(f"{side}orders", []):
+                    if order.get("id") is not None:
+                        remote[str(order["id"])] = order
+                        sides[str(order["id"])] = side
+
+        events: List[OrderEvent] = []
+        gone: List[TrackedOrder] = []
+        for order_id, order in list(self.open_orders.items()):
+            remote_order = remote.get(order_id)
+            if remote_order is None:
+                gone.append(self.open_orders.pop(order_id))
+                continue
+            remaining = float(remote_order.get("amount", order.amount))
+            if remaining < order.amount:
+                filled = order.amount - remaining
+                order.amount = remaining
+                events.append(OrderEvent("partial_fill", order, filled))
+                self._apply_fill(order, filled)
+            if order.cancel_requested:
+                # The cancel didn't take, keep tracking it
+                order.cancel_requested = False
+                self.stats.order_mismatches += 1
+
+        # Gone from the book, the order history says whether they filled or were cancelled. Orders
+        # still open were settled above, so their fills are already counted when these are matched
+        unknown = False
+        if gone:
+            for order, filled in self._match_history(gone, self._completed_orders()):
+                if filled is None:
+                    events.append(OrderEvent("unknown", order, order.amount))
+                    unknown = True
+                    continue
+                if filled >= order.amount - self.balance_tolerance:
+                    events.append(OrderEvent("fill", order, order.amount))
+                    self._apply_fill(order, order.amount)
+                    if order.cancel_requested:
+                        self.stats.order_mismatches += 1
+                    continue
+                if filled > 0:
+                    events.append(OrderEvent("partial_fill", order, filled))
+                    self._apply_fill(order, filled)
+                    order.amount -= filled
+                events.append(OrderEvent("cancel", order, order.amount))
+                if not order.cancel_requested:
+                    # Cancelled somewhere other than this tracker
+                    self.stats.order_mismatches += 1
+
+        for order_id, remote_order in remote.items():
+            if order_id not in self.open_orders:
+                order = TrackedOrder(order_id, sides[order_id], remote_order.get("coin", ""),
+                                     remote_order.get("amount", 0), remote_order.get("rate", 0), remote_order.get("market"))
+                self.open_orders[order_id] = order
+                events.append(OrderEvent("adopted", order, order.amount))
+
+        self.stats.reconciliations += 1
+        self.stats.order_mismatches += sum(1 for event in events if event.kind == "adopted")
+        self._ambiguous = False
+        if events:
+            self._interval = self.min_interval
+        elif self.open_orders:
+            self._interval = min(self._interval * self.backoff, self.max_interval)
+        else:
+            # Nothing of ours can fill, only orders placed elsewhere would show up
+            self._interval = self.max_interval
+        self._next_reconcile = self.clock() + self._interval
+
+        if unknown:
+            # Leave the estimate alone and take the balances from the API instead
+            self.stats.order_mismatches += 1
+            self.reconcile_balances()
+        self._emit(events)
+        return events
+
+    def _completed_orders(self) -> List[CompletedOrder]:
+        response = self.read_only.get_my_order_history()
+        self.stats.read_only_calls += 1
+        completed: List[CompletedOrder] = []
+        for side in ("buy", "sell"):
+            for fill in response.get(f"{side}orders", []):
+                completed.append({**fill, "side": side})
+        return completed
+
+    def _match_history(self, gone: List[TrackedOrder], history: List[CompletedOrder]) -> List[Tuple[TrackedOrder, Optional[float]]]:
+        """Work out how much of each order that left the book filled, None where the history can't tell."""
+        results: List[Tuple[TrackedOrder, Optional[float]]] = []
+        groups: Dict[HistoryKey, List[TrackedOrder]] = {}
+        for order in gone:
+            groups.setdefault(order.history_key, []).append(order)
+
+        for key, orders in groups.items():
+            open_siblings = [order for order in self.open_orders.values() if order.history_key == key]
+            members = orders + open_siblings
+            settled_amount, settled_since = self._settled.get(key, (0.0, None))
+            starts = [order.placed_at for order in members] + ([settled_since] if settled_since else [])
+            if any(start is None for start in starts):
+                results.extend((order, None) for order in orders)
+                continue
+            since = min(starts)
+
+            # Each history row belongs to at most one order, rows attributed to earlier orders are skipped
+            consumed = Counter()
+            rows: List[Tuple[Any, ...]] = []
+            dated = True
+            for fill in history:
+                row = (fill["side"], str(fill.get("coin", "")).upper(), _quote_currency(fill.get("market")),
+                       float(fill.get("rate", 0)), float(fill.get("amount", 0)), str(fill.get("solddate", "")))
+                if row[:3] != key[:3] or abs(row[3] - key[3]) > 1e-9 * max(1.0, key[3]):
+                    continue
+                solddate = _parse_solddate(row[5])
+                if solddate is None:
+                    dated = False
+                    break
+                if solddate < since:
+                    continue
+                consumed[row] += 1
+                if consumed[row] <= self._consumed[row]:
+                    continue
+                rows.append(row)
+            if not dated:
+                results.extend((order, None) for order in orders)
+                continue
+
+            new = sum(row[4] for row in rows) - sum(order.filled for order in members) - settled_amount
+            expected = sum(order.amount for order in orders)
+            if abs(new) <= self.balance_tolerance:
+                outcome: List[Optional[float]] = [0.0] * len(orders)
+            elif new < 0:
+                # Fewer fills than already reported, e.g. after an edit moved the rate
+                outcome = [None] * len(orders)
+            elif len(orders) == 1:
+                outcome = [min(new, orders[0].amount)]
+            elif new >= expected - self.balance_tolerance:
+                outcome = [order.amount for order in orders]
+            else:
+                # Several same-rate orders went and only some of them filled, there's no telling which
+                outcome = [None] * len(orders)
+            results.extend(zip(orders, outcome))
+
+            if open_siblings:
+                self._settled[key] = (settled_amount + sum(order.filled for order in orders) + max(0.0, new), since)
+            else:
+                self._settled.pop(key, None)
+                self._consumed.update(Counter(rows))
+        return results
+
+    def _apply_fill(self, order: TrackedOrder, amount: float) -> None:
+        order.filled += amount
+        quote = _quote_currency(order.market)
+        value = amount * order.rate
+        sign = 1 if order.side == "buy" else -1
+        self.balances[order.cointype] = self.balances.get(order.cointype, 0.0) + sign * amount
+        self.balances[quote] = self.balances.get(quote, 0.0) - sign * value
+        self._balances_dirty = True
+
+    def reconcile_balances(self) -> Dict[str, float]:
+        response = self.read_only.get_my_coin_balances()
+        self.stats.read_only_calls += 1
+        actual: Dict[str, float] = {}
+        for item in response.get("balances", []):
+            for coin, details in item.items():
+                actual[coin.upper()] = float(details.get("balance", 0))
+
+        if self.stats.balance_checks or self.balances:
+            drift = 0.0
+            for coin in set(actual) | set(self.balances):
+                drift = max(drift, abs(actual.get(coin, 0.0) - self.balances.get(coin, 0.0)))
+            self.stats.balance_checks += 1
+            self.stats.total_balance_drift += drift
+            self.stats.max_balance_drift = max(self.stats.max_balance_drift, drift)
+            if drift > self.balance_tolerance:
+                self.stats.balance_mismatches += 1
+
+        self.balances = actual
+        self._balances_dirty = False
+        self._next_balance_sync = self.clock() + self.balance_interval
+        return dict(self.balances)
+
+    def balance(self, cointype: str) -> float:
+        return self.balances.get(cointype.upper(), 0.0)
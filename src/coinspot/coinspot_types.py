@@ -110,4 +110,24 @@ class MyCoinBalancesResponse(BaseApiResponse):
     balances: List[Dict[str, CoinBalance]]
 
 class MyCoinBalanceResponse(BaseApiResponse):
-    balance: Dict[str, Union[CoinBalance, Dict[str, Union[float, int]]]]
\ No newline at end of file
+    balance: Dict[str, Union[CoinBalance, Dict[str, Union[float, int]]]]
+
+class Position(Dict[str, float]):
+    quantity: float
+    price: float
+    market_value: float
+    cost_basis: float
+    unrealised: float
+    realised: float
+    exposure: float
+    untracked: float
+    withdrawn: float
+
+class PortfolioValuation(Dict[str, Any]):
+    quote: str
+    total_value: float
+    cost_basis: float
+    unrealised: float
+    realised: float
+    positions: Dict[str, Position]
+    unpriced: List[str]
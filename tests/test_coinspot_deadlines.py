@@ -0,0 +1,151 @@
+import time
+import threading
+import pytest
+import requests
+from coinspot.coinspot import CoinspotPublicApi, CoinspotApiError, CoinspotTimeoutError, LatencyStats, Coinspot, create_coinspot_api
+
+# requests.request is patched out, so these run offline
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+@pytest.fixture
+def fake_request(monkeypatch):
+    calls = []
+    delays = []
+    lock = threading.Lock()
+
+    def request(method, url, timeout=None, **kwargs):
+        with lock:
+            attempt = len(calls)
+            calls.append((method, url, timeout))
+        delay = delays[attempt] if attempt < len(delays) else 0.0
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise requests.Timeout("read timed out")
+        time.sleep(delay)
+        return FakeResponse({"status": "ok", "attempt": attempt})
+
+    monkeypatch.setattr(requests, "request", request)
+    return calls, delays
+
+def test_timeout_passed_to_requests(fake_request):
+    calls, delays = fake_request
+    api = CoinspotPublicApi(timeout=5.0)
+    api.get_latest_prices()
+    method, url, timeout = calls[0]
+    assert method == "GET"
+    assert url.endswith("/latest")
+    assert 0 < timeout <= 5.0
+
+def test_slow_request_raises_timeout(fake_request):
+    calls, delays = fake_request
+    delays.append(1.0)
+    api = CoinspotPublicApi(timeout=0.05)
+    with pytest.raises(CoinspotTimeoutError):
+        api.get_latest_prices()
+    assert api.latency.timeouts == 1
+
+def test_batch_deadline_covers_several_calls(fake_request):
+    calls, delays = fake_request
+    delays.extend([0.06, 0.06, 0.06])
+    api = CoinspotPublicApi(timeout=5.0)
+    with pytest.raises(CoinspotTimeoutError):
+        with api.deadline(0.1):
+            api.get_latest_prices()
+            api.get_latest_prices()
+            api.get_latest_prices()
+    assert len(calls) == 2
+
+def test_hedged_request_wins(fake_request):
+    calls, delays = fake_request
+    delays.extend([1.0, 0.0])
+    api = CoinspotPublicApi(timeout=2.0, hedge=True, hedge_delay=0.05)
+    start = time.monotonic()
+    response = api.get_open_orders("BTC")
+    assert time.monotonic() - start < 0.5
+    assert response["attempt"] == 1
+    assert api.latency.hedges_sent == 1
+    assert api.latency.hedges_won == 1
+
+def test_hedge_waits_for_enough_samples(fake_request):
+    calls, delays = fake_request
+    api = CoinspotPublicApi(hedge=True, hedge_min_samples=5)
+    for _ in range(5):
+        api.get_latest_prices()
+    assert api.latency.hedges_sent == 0
+    assert api._hedge_after() is not None
+
+def test_latency_percentiles():
+    stats = LatencyStats()
+    for value in range(1, 101):
+        stats.record(value / 1000)
+    assert stats.percentile(50) == pytest.approx(0.050, abs=0.002)
+    assert stats.percentile(99) == pytest.approx(0.099, abs=0.002)
+    assert stats.as_dict()["max"] == pytest.approx(0.1)
+    assert LatencyStats().percentile(50) is None
+
+def test_wrapper_latency_stats(fake_request):
+    api = Coinspot(timeout=1.0)
+    with api.deadline(1.0):
+        api.latest_prices()
+    assert api.latency_stats()["public"]["requests"] == 1
+
+def test_deadline_covers_connect_and_read(monkeypatch):
+    # Each phase stays under the per-socket timeout, together they don't fit the deadline
+    def request(method, url, timeout=None, **kwargs):
+        time.sleep(timeout * 0.8)  # connect
+        time.sleep(timeout * 0.8)  # read
+        return FakeResponse({"status": "ok"})
+
+    monkeypatch.setattr(requests, "request", request)
+    api = CoinspotPublicApi(timeout=0.1)
+    start = time.monotonic()
+    with pytest.raises(CoinspotTimeoutError):
+        api.get_latest_prices()
+    assert time.monotonic() - start < 0.15
+    assert api.latency.timeouts == 1
+
+def test_hedged_timeout_counted_once_and_recorded(fake_request):
+    calls, delays = fake_request
+    delays.extend([1.0, 1.0])
+    api = CoinspotPublicApi(timeout=0.1, hedge=True, hedge_delay=0.02)
+    with pytest.raises(CoinspotTimeoutError):
+        api.get_latest_prices()
+    assert api.latency.hedges_sent == 1
+    assert api.latency.timeouts == 1
+    time.sleep(0.1)
+    assert api.latency.percentile(100) >= 0.05
+
+def test_close_refuses_new_calls(fake_request):
+    api = Coinspot(timeout=1.0)
+    api.latest_prices()
+    api.close()
+    with pytest.raises(CoinspotApiError) as excinfo:
+        api.latest_prices()
+    assert excinfo.value.status == "Closed"
+
+def test_request_threads_are_daemons(monkeypatch):
+    seen = []
+
+    def request(method, url, timeout=None, **kwargs):
+        seen.append(threading.current_thread().daemon)
+        return FakeResponse({"status": "ok"})
+
+    monkeypatch.setattr(requests, "request", request)
+    CoinspotPublicApi(timeout=None).get_latest_prices()
+    assert seen == [True]
+
+def test_hedge_settings_passed_through():
+    api = create_coinspot_api(hedge=True, hedge_percentile=90.0, hedge_min_samples=5, hedge_delay=0.2, max_concurrency=3)
+    assert (api.public.hedge_percentile, api.public.hedge_min_samples, api.public.hedge_delay) == (90.0, 5, 0.2)
+    assert api.public.max_concurrency == 3
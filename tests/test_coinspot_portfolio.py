@@ -0,0 +1,201 @@
+import math
+import pytest
+from datetime import datetime, timedelta, timezone
+from coinspot.coinspot_portfolio import Portfolio
+
+# Offline, built from canned responses shaped like the API's
+
+def history(buys=(), sells=()):
+    def orders(rows):
+        return [{"coin": coin, "market": f"{coin}/AUD", "amount": amount, "rate": rate, "total": amount * rate, "solddate": date}
+                for coin, amount, rate, date in rows]
+    return {"status": "ok", "buyorders": orders(buys), "sellorders": orders(sells)}
+
+PRICES = {"status": "ok", "prices": {"btc": {"bid": 190.0, "ask": 210.0, "last": 200.0},
+                                     "eth": {"bid": 9.0, "ask": 11.0, "last": 10.0},
+                                     "btc_usdt": {"bid": 1.0, "ask": 1.0, "last": 1.0}}}
+
+BALANCES = {"status": "ok", "balances": [{"AUD": {"balance": 500.0, "audbalance": 500.0, "rate": 1}},
+                                         {"BTC": {"balance": 1.0, "audbalance": 200.0, "rate": 200.0}}]}
+
+def test_fifo_cost_basis_and_pnl():
+    portfolio = Portfolio("fifo")
+    portfolio.add_order_history(history(buys=[("BTC", 1.0, 100.0, "2024-01-01"), ("BTC", 1.0, 150.0, "2024-01-02")],
+                                        sells=[("BTC", 1.0, 180.0, "2024-01-03")]))
+    portfolio.update_prices(PRICES)
+    btc = portfolio.position("BTC")
+    assert btc["realised"] == pytest.approx(80.0)
+    assert btc["cost_basis"] == pytest.approx(150.0)
+    assert btc["unrealised"] == pytest.approx(50.0)
+
+def test_average_cost_basis():
+    portfolio = Portfolio("average")
+    portfolio.add_order_history(history(buys=[("BTC", 1.0, 100.0, "2024-01-01"), ("BTC", 1.0, 150.0, "2024-01-02")],
+                                        sells=[("BTC", 1.0, 180.0, "2024-01-03")]))
+    btc = portfolio.position("BTC")
+    assert btc["realised"] == pytest.approx(55.0)
+    assert btc["cost_basis"] == pytest.approx(125.0)
+
+def test_refetched_history_is_not_double_counted():
+    portfolio = Portfolio()
+    response = history(buys=[("ETH", 2.0, 5.0, "2024-01-01")])
+    assert portfolio.add_order_history(response) == 1
+    assert portfolio.add_order_history(response) == 0
+    assert portfolio.position("ETH")["cost_basis"] == pytest.approx(10.0)
+
+def test_late_fill_replays_coin():
+    portfolio = Portfolio("fifo")
+    portfolio.add_order_history(history(buys=[("BTC", 1.0, 150.0, "2024-01-02")], sells=[("BTC", 1.0, 180.0, "2024-01-03")]))
+    portfolio.add_order_history(history(buys=[("BTC", 1.0, 100.0, "2024-01-01")]))
+    btc = portfolio.position("BTC")
+    assert btc["realised"] == pytest.approx(80.0)
+    assert btc["cost_basis"] == pytest.approx(150.0)
+
+def test_valuation_with_balances_and_exposure():
+    portfolio = Portfolio()
+    portfolio.add_order_history(history(buys=[("BTC", 1.0, 100.0, "2024-01-01"), ("ETH", 1.0, 20.0, "2024-01-01")],
+                                        sells=[("ETH", 1.0, 30.0, "2024-01-02")]))
+    portfolio.update_balances(BALANCES)
+    portfolio.update_prices(PRICES)
+    valuation = portfolio.valuation()
+    assert valuation["total_value"] == pytest.approx(700.0)
+    assert valuation["realised"] == pytest.approx(10.0)
+    assert valuation["unrealised"] == pytest.approx(100.0)
+    assert valuation["positions"]["BTC"]["exposure"] == pytest.approx(200.0 / 700.0)
+    assert valuation["positions"]["ETH"]["quantity"] == 0.0
+    assert sum(p["exposure"] for p in valuation["positions"].values()) == pytest.approx(1.0)
+
+def test_incremental_fill_and_price():
+    portfolio = Portfolio()
+    portfolio.update_balances(BALANCES)
+    # A fill sold after the snapshot moves the held quantity until the next one is loaded
+    later = (datetime.now(timezone.utc) + timedelta(minutes=1)).isoformat()
+    portfolio.add_order_history(history(buys=[("ETH", 2.0, 10.0, later)]))
+    portfolio.update_price("ETH", 12.0)
+    eth = portfolio.position("ETH")
+    assert eth["quantity"] == pytest.approx(2.0)
+    assert eth["unrealised"] == pytest.approx(4.0)
+    assert portfolio.position("AUD")["quantity"] == pytest.approx(480.0)
+    portfolio.update_balances({"status": "ok", "balances": [{"AUD": {"balance": 480.0}}, {"BTC": {"balance": 1.0}}, {"ETH": {"balance": 2.0}}]})
+    assert portfolio.position("ETH")["quantity"] == pytest.approx(2.0)
+    assert portfolio.position("AUD")["quantity"] == pytest.approx(480.0)
+
+def test_withdrawn_coins_carry_no_cost_basis():
+    portfolio = Portfolio()
+    portfolio.add_order_history(history(buys=[("BTC", 1.0, 100.0, "2024-01-01")]))
+    portfolio.update_balances({"status": "ok", "balances": [{"AUD": {"balance": 0.0}}]})
+    portfolio.update_price("BTC", 200.0)
+    btc = portfolio.position("BTC")
+    assert (btc["quantity"], btc["market_value"], btc["cost_basis"], btc["unrealised"]) == (0.0, 0.0, 0.0, 0.0)
+    assert btc["withdrawn"] == pytest.approx(1.0)
+    assert portfolio.valuation()["unrealised"] == 0.0
+
+def test_unrealised_matches_market_value_less_cost():
+    portfolio = Portfolio()
+    portfolio.add_order_history(history(buys=[("BTC", 2.0, 100.0, "2024-01-01")]))
+    portfolio.update_balances({"status": "ok", "balances": [{"BTC": {"balance": 1.5}}]})
+    portfolio.update_prices(PRICES)
+    btc = portfolio.position("BTC")
+    assert btc["cost_basis"] == pytest.approx(150.0)
+    assert btc["unrealised"] == pytest.approx(btc["market_value"] - btc["cost_basis"])
+    assert btc["withdrawn"] == pytest.approx(0.5)
+
+def test_deposited_coins_are_untracked():
+    portfolio = Portfolio()
+    portfolio.add_order_history(history(buys=[("BTC", 1.0, 100.0, "2024-01-01")]))
+    portfolio.update_balances({"status": "ok", "balances": [{"BTC": {"balance": 3.0}}]})
+    portfolio.update_prices(PRICES)
+    btc = portfolio.position("BTC")
+    assert btc["untracked"] == pytest.approx(2.0)
+    assert btc["unrealised"] == pytest.approx(100.0)
+
+class FakeHistoryApi:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def get_my_order_history(self, cointype=None, markettype=None, startdate=None, enddate=None, limit=None):
+        self.calls.append((startdate, enddate, limit))
+        rows = [row for row in self.rows if (not startdate or row["solddate"][:10] >= startdate)
+                and (not enddate or row["solddate"][:10] <= enddate)]
+        rows = sorted(rows, key=lambda row: row["solddate"], reverse=True)[:limit]
+        return {"status": "ok", "buyorders": rows, "sellorders": []}
+
+    def get_my_coin_balances(self):
+        return {"status": "ok", "balances": [{"BTC": {"balance": sum(row["amount"] for row in self.rows)}}]}
+
+class FakePricesApi:
+    def get_latest_prices(self):
+        return PRICES
+
+def test_refresh_pages_through_history():
+    rows = [{"coin": "BTC", "market": "BTC/AUD", "amount": 1.0, "rate": 100.0 + day, "total": 100.0 + day,
+             "solddate": f"2024-01-{day:02d}T10:00:00Z"} for day in range(1, 6)]
+    api = FakeHistoryApi(rows)
+    portfolio = Portfolio()
+    portfolio.refresh(api, FakePricesApi(), limit=2)
+    assert portfolio.position("BTC")["cost_basis"] == pytest.approx(515.0)
+    assert len(api.calls) > 2
+    assert not portfolio.history_truncated
+
+    # The next refresh picks up from the last fill's day and ignores the overlap
+    api.rows.append({"coin": "BTC", "market": "BTC/AUD", "amount": 1.0, "rate": 50.0, "total": 50.0, "solddate": "2024-01-05T12:00:00Z"})
+    api.calls.clear()
+    portfolio.refresh(api, FakePricesApi(), limit=10)
+    assert api.calls[0][0] == "2024-01-05"
+    assert portfolio.position("BTC")["cost_basis"] == pytest.approx(565.0)
+
+def test_balances_before_history_not_double_counted():
+    portfolio = Portfolio()
+    portfolio.update_balances(BALANCES)
+    portfolio.add_order_history(history(buys=[("BTC", 1.0, 100.0, "2024-01-01")]))
+    assert portfolio.position("BTC")["quantity"] == pytest.approx(1.0)
+    assert portfolio.position("AUD")["quantity"] == pytest.approx(500.0)
+
+def test_quantity_from_fills_without_balances():
+    portfolio = Portfolio()
+    portfolio.add_order_history(history(buys=[("BTC", 1.0, 100.0, "2024-01-01")]))
+    assert portfolio.position("BTC")["quantity"] == pytest.approx(1.0)
+    assert portfolio.position("AUD")["quantity"] == pytest.approx(-100.0)
+
+def test_identical_fills_in_one_response():
+    portfolio = Portfolio()
+    response = history(buys=[("BTC", 0.1, 100.0, "2024-01-01"), ("BTC", 0.1, 100.0, "2024-01-01")])
+    assert portfolio.add_order_history(response) == 2
+    assert portfolio.position("BTC")["quantity"] == pytest.approx(0.2)
+    assert portfolio.position("BTC")["cost_basis"] == pytest.approx(20.0)
+    assert portfolio.add_order_history(response) == 0
+    assert portfolio.add_order_history(history(buys=[("BTC", 0.1, 100.0, "2024-01-01")])) == 0
+    assert portfolio.position("BTC")["cost_basis"] == pytest.approx(20.0)
+
+def test_fills_deduplicated_by_id():
+    portfolio = Portfolio()
+    response = history(buys=[("BTC", 0.1, 100.0, "2024-01-01"), ("BTC", 0.1, 100.0, "2024-01-01")])
+    for i, order in enumerate(response["buyorders"]):
+        order["id"] = f"order-{i}"
+    assert portfolio.add_order_history(response) == 2
+    response["buyorders"].pop()
+    assert portfolio.add_order_history(response) == 0
+
+def test_unpriced_coin_left_out_of_totals():
+    portfolio = Portfolio()
+    portfolio.add_order_history(history(buys=[("BTC", 1.0, 100.0, "2024-01-01"), ("XYZ", 10.0, 5.0, "2024-01-01")]))
+    portfolio.update_balances({"status": "ok", "balances": [{"AUD": {"balance": 100.0}}, {"BTC": {"balance": 1.0}}, {"XYZ": {"balance": 10.0}}]})
+    portfolio.update_prices(PRICES)
+    valuation = portfolio.valuation()
+    xyz = valuation["positions"]["XYZ"]
+    assert math.isnan(xyz["unrealised"])
+    assert math.isnan(xyz["exposure"])
+    assert valuation["unpriced"] == ["XYZ"]
+    assert valuation["total_value"] == pytest.approx(300.0)
+    assert valuation["unrealised"] == pytest.approx(100.0)
+
+def test_other_quote_markets_are_skipped():
+    portfolio = Portfolio()
+    response = {"status": "ok", "buyorders": [{"coin": "BTC", "market": "BTC/USDT", "amount": 1.0, "rate": 1.0, "total": 1.0, "solddate": "2024-01-01"}], "sellorders": []}
+    assert portfolio.add_order_history(response) == 0
+    assert portfolio.skipped_fills == 1
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        Portfolio("lifo")
@@ -0,0 +1,239 @@
+import pytest
+import requests
+from datetime import datetime, timedelta, timezone
+from coinspot.coinspot import CoinspotApiError
+from coinspot.coinspot_state import OrderStateTracker, OrderEvent
+
+# These run against in-memory fakes, no API key needed
+
+def solddate(seconds: float = 0.0) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat().replace("+00:00", "Z")
+
+def fill(amount, rate, coin="BTC", market=None, seconds=0.0):
+    return {"coin": coin, "market": market or f"{coin}/AUD", "amount": amount, "rate": rate, "solddate": solddate(seconds)}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class FakeApi:
+    def __init__(self):
+        self.next_id = 0
+        self.fail_cancel = False
+        self.fail_place = False
+
+    def place_market_buy_order(self, cointype, amount, rate, markettype=None):
+        if self.fail_place:
+            raise requests.ConnectionError("connection reset")
+        self.next_id += 1
+        return {"status": "ok", "coin": cointype, "market": f"{cointype}/AUD", "amount": amount, "rate": rate, "id": str(self.next_id)}
+
+    def place_market_sell_order(self, cointype, amount, rate, markettype=None):
+        return self.place_market_buy_order(cointype, amount, rate, markettype)
+
+    def edit_open_market_buy_order(self, cointype, id, rate, newrate):
+        return {"status": "ok", "updated": True, "id": id, "coin": cointype, "rate": rate, "newrate": newrate}
+
+    def cancel_buy_order(self, id):
+        if self.fail_cancel:
+            raise CoinspotApiError("error", "Order not found")
+        return {"status": "ok"}
+
+    def cancel_all_buy_orders(self, coin=None):
+        return {"status": "ok"}
+
+class FakeReadOnlyApi:
+    def __init__(self):
+        self.open_buy = []
+        self.filled_buy = []
+        self.balances = {"AUD": 1000.0}
+        self.calls = 0
+
+    def get_my_open_market_orders(self, cointype=None, markettype=None):
+        self.calls += 1
+        return {"status": "ok", "buyorders": list(self.open_buy), "sellorders": []}
+
+    def get_my_open_limit_orders(self, cointype=None):
+        self.calls += 1
+        return {"status": "ok", "buyorders": [], "sellorders": []}
+
+    def get_my_order_history(self, cointype=None, markettype=None, startdate=None, enddate=None, limit=None):
+        self.calls += 1
+        return {"status": "ok", "buyorders": list(self.filled_buy), "sellorders": []}
+
+    def get_my_coin_balances(self):
+        self.calls += 1
+        return {"status": "ok", "balances": [{coin: {"balance": value, "audbalance": 0, "rate": 0}} for coin, value in self.balances.items()]}
+
+@pytest.fixture
+def tracker_setup():
+    clock = FakeClock()
+    api = FakeApi()
+    read_only = FakeReadOnlyApi()
+    tracker = OrderStateTracker(api, read_only, min_interval=1.0, max_interval=30.0, clock=clock)
+    tracker.poll()
+    return tracker, api, read_only, clock
+
+def test_poll_skips_until_due(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    calls = read_only.calls
+    for _ in range(100):
+        assert tracker.poll() == []
+    assert read_only.calls == calls
+    assert tracker.stats.skipped_polls == 100
+
+def test_fill_event_and_balance_estimate(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    events = []
+    tracker.add_listener(events.append)
+    response = tracker.place_market_buy_order("BTC", 0.5, 100.0)
+    read_only.open_buy = [{"id": response["id"], "coin": "BTC", "market": "BTC/AUD", "amount": 0.5, "rate": 100.0}]
+    clock.now += 1.0
+    tracker.poll()
+    assert response["id"] in tracker.open_orders
+
+    read_only.open_buy = [{"id": response["id"], "coin": "BTC", "market": "BTC/AUD", "amount": 0.2, "rate": 100.0}]
+    clock.now += 2.0
+    assert [event.kind for event in tracker.poll()] == ["partial_fill"]
+
+    read_only.open_buy = []
+    read_only.filled_buy = [fill(0.3, 100.0), fill(0.2, 100.0)]
+    clock.now += 2.0
+    assert [event.kind for event in tracker.poll()] == ["fill"]
+    assert [event.kind for event in events] == ["partial_fill", "fill"]
+    assert tracker.balance("BTC") == pytest.approx(0.5)
+    assert tracker.balance("AUD") == pytest.approx(950.0)
+
+    read_only.balances = {"AUD": 950.0, "BTC": 0.5}
+    tracker.reconcile_balances()
+    assert tracker.stats.balance_mismatches == 0
+
+def test_interval_backs_off_when_nothing_changes(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    response = tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    read_only.open_buy = [{"id": response["id"], "coin": "BTC", "amount": 1.0, "rate": 100.0}]
+    reconciles = 0
+    for _ in range(600):
+        clock.now += 0.1
+        before = tracker.stats.reconciliations
+        tracker.poll()
+        reconciles += tracker.stats.reconciliations - before
+    assert reconciles < 10
+
+def test_cancel(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    events = []
+    tracker.add_listener(events.append)
+    response = tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    tracker.cancel_buy_order(response["id"])
+    assert tracker.reconcile_due
+    assert [(event.kind, event.amount) for event in tracker.poll()] == [("cancel", 1.0)]
+    assert tracker.open_orders == {}
+    assert events[0].kind == "cancel"
+
+    response = tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    api.fail_cancel = True
+    with pytest.raises(CoinspotApiError):
+        tracker.cancel_buy_order(response["id"])
+    assert tracker.reconcile_due
+
+def test_cancel_all_resolved_on_reconcile(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    tracker.place_market_buy_order("ETH", 1.0, 10.0)
+    tracker.cancel_all_buy_orders("BTC")
+    read_only.open_buy = [{"id": "2", "coin": "ETH", "amount": 1.0, "rate": 10.0}]
+    events = tracker.poll()
+    assert [(event.kind, event.order.cointype) for event in events] == [("cancel", "BTC")]
+    assert list(tracker.open_orders) == ["2"]
+
+def test_adopts_orders_placed_elsewhere(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    read_only.open_buy = [{"id": "abc", "coin": "DOGE", "amount": 10.0, "rate": 0.1}]
+    events = tracker.poll(force=True)
+    assert isinstance(events[0], OrderEvent)
+    assert events[0].kind == "adopted"
+    assert tracker.stats.order_mismatches == 1
+
+def test_partial_fill_before_cancel(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    response = tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    tracker.cancel_buy_order(response["id"])
+    read_only.filled_buy = [fill(0.6, 100.0)]
+    events = tracker.poll()
+    assert [(event.kind, event.amount) for event in events] == [("partial_fill", 0.6), ("cancel", pytest.approx(0.4))]
+    assert tracker.balance("BTC") == pytest.approx(0.6)
+    assert tracker._balances_dirty
+
+def test_external_cancel_is_not_a_fill(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    response = tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    read_only.open_buy = []
+    events = tracker.poll(force=True)
+    assert [event.kind for event in events] == ["cancel"]
+    assert tracker.balance("BTC") == 0.0
+    assert tracker.balance("AUD") == 1000.0
+    assert tracker.stats.order_mismatches == 1
+
+def test_fill_before_cancel_all(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    response = tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    tracker.cancel_all_buy_orders()
+    read_only.filled_buy = [fill(1.0, 100.0)]
+    events = tracker.poll()
+    assert [event.kind for event in events] == ["fill"]
+    assert tracker.balance("BTC") == pytest.approx(1.0)
+
+def test_connection_error_marks_ambiguous(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    api.fail_place = True
+    with pytest.raises(requests.ConnectionError):
+        tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    assert tracker.reconcile_due
+
+def test_earlier_same_rate_fill_is_not_matched(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    read_only.filled_buy = [fill(1.0, 100.0, seconds=-3600)]
+    tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    events = tracker.poll(force=True)
+    assert [(event.kind, event.amount) for event in events] == [("cancel", 1.0)]
+    assert tracker.stats.order_mismatches == 1
+    assert tracker.balance("BTC") == 0.0
+
+def test_other_market_fill_is_not_matched(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    read_only.filled_buy = [fill(1.0, 100.0, market="BTC/USDT")]
+    events = tracker.poll(force=True)
+    assert [event.kind for event in events] == ["cancel"]
+    assert "USDT" not in tracker.balances
+
+def test_concurrent_same_rate_orders(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    first = tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    second = tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    tracker.cancel_buy_order(second["id"])
+    read_only.filled_buy = [fill(1.0, 100.0)]
+    read_only.balances = {"AUD": 900.0, "BTC": 1.0}
+    events = tracker.poll()
+    # One filled and one was cancelled, but the history can't say which
+    assert [event.kind for event in events] == ["unknown", "unknown"]
+    assert tracker.balance("BTC") == pytest.approx(1.0)
+    assert tracker.balance("AUD") == pytest.approx(900.0)
+
+def test_same_rate_order_settles_while_sibling_open(tracker_setup):
+    tracker, api, read_only, clock = tracker_setup
+    first = tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    second = tracker.place_market_buy_order("BTC", 1.0, 100.0)
+    read_only.open_buy = [{"id": second["id"], "coin": "BTC", "amount": 1.0, "rate": 100.0}]
+    read_only.filled_buy = [fill(1.0, 100.0)]
+    read_only.balances = {"AUD": 900.0, "BTC": 1.0}
+    assert [event.kind for event in tracker.poll(force=True)] == ["fill"]
+
+    # The first order's fill stays in the history and must not be counted again
+    read_only.open_buy = []
+    assert [event.kind for event in tracker.poll(force=True)] == ["cancel"]
+    assert tracker.stats.balance_mismatches == 0